@@ -16,6 +16,19 @@ import re
 from urllib.parse import urljoin
 import json
 import hashlib
+import threading
+import queue
+import socketserver
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import mmap
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: el filtro masivo usa listas de Python sin él
+    np = None
 
 # Cargar variables de entorno
 load_dotenv()
@@ -30,6 +43,555 @@ logging.basicConfig(
     ]
 )
 
+class CatalogArchive:
+    """Archivo histórico append-only con las páginas crudas de cursos_/
+
+    Cada registro es una cabecera binaria fija (magic, timestamp de la
+    verificación, página, longitud) seguida del JSON comprimido con zlib
+    de la consulta AJAX y su respuesta. La lectura usa mmap y solo
+    descomprime los registros que se piden.
+
+    Junto al archivo se mantiene un índice (<archivo>.idx) con el offset
+    del primer registro de cada verificación, para que las consultas por
+    fecha salten directamente al primer registro que interesa.
+    """
+
+    MAGIC = b'SCA1'
+    HEADER = struct.Struct('<4sdII')
+    INDEX_ENTRY = struct.Struct('<dQ')
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self._lock = threading.Lock()
+        self._last_indexed_ts = None
+
+    def append(self, run_ts, page, query, response):
+        """Añadir una página cruda al final del archivo"""
+        payload = json.dumps({'query': query, 'response': response},
+                             ensure_ascii=False, separators=(',', ':'))
+        data = zlib.compress(payload.encode('utf-8'), 6)
+        with self._lock, open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(self.HEADER.pack(self.MAGIC, run_ts, page, len(data)) + data)
+            self._index_run(run_ts, offset)
+
+    def _index_run(self, run_ts, offset):
+        """Registrar en el índice el primer registro de cada verificación"""
+        if offset > 0 and not os.path.exists(self.index_path):
+            # Archivo sin índice desde el principio: un índice parcial daría saltos erróneos
+            return
+        if self._last_indexed_ts is None and os.path.exists(self.index_path):
+            size = os.path.getsize(self.index_path)
+            if size >= self.INDEX_ENTRY.size:
+                with open(self.index_path, 'rb') as f:
+                    f.seek(size - size % self.INDEX_ENTRY.size - self.INDEX_ENTRY.size)
+                    self._last_indexed_ts = self.INDEX_ENTRY.unpack(f.read(self.INDEX_ENTRY.size))[0]
+        
+        if run_ts == self._last_indexed_ts:
+            return
+        with open(self.index_path, 'ab') as f:
+            f.write(self.INDEX_ENTRY.pack(run_ts, offset))
+        self._last_indexed_ts = run_ts
+
+    def _start_offset(self, since):
+        """Offset del primer registro con timestamp >= since según el índice (0 si no hay índice)"""
+        if since is None or not os.path.exists(self.index_path):
+            return 0
+        
+        entries = os.path.getsize(self.index_path) // self.INDEX_ENTRY.size
+        if entries == 0:
+            return 0
+        
+        with open(self.index_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Búsqueda binaria: las verificaciones se añaden en orden de tiempo
+            low, high = 0, entries
+            while low < high:
+                middle = (low + high) // 2
+                if self.INDEX_ENTRY.unpack_from(mm, middle * self.INDEX_ENTRY.size)[0] < since:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == entries:
+                return None
+            return self.INDEX_ENTRY.unpack_from(mm, low * self.INDEX_ENTRY.size)[1]
+
+    @staticmethod
+    def _to_timestamp(value):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        return value.timestamp()
+
+    def iter_records(self, since=None, until=None, decode=True):
+        """Recorrer los registros (opcionalmente entre dos fechas) sin cargar todo el historial"""
+        since = self._to_timestamp(since)
+        until = self._to_timestamp(until)
+        
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        
+        offset = self._start_offset(since)
+        if offset is None:
+            # Todas las verificaciones indexadas son anteriores a since
+            return
+        
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            if offset > size:
+                logging.warning("⚠️ Índice del archivo histórico desfasado, se recorre desde el inicio")
+                offset = 0
+            while offset + self.HEADER.size <= size:
+                magic, run_ts, page, length = self.HEADER.unpack_from(mm, offset)
+                if magic != self.MAGIC:
+                    logging.warning(f"⚠️ Archivo histórico corrupto en byte {offset}, lectura detenida")
+                    return
+                
+                start = offset + self.HEADER.size
+                offset = start + length
+                if offset > size:
+                    logging.warning("⚠️ Último registro del archivo histórico incompleto, ignorado")
+                    return
+                
+                if since is not None and run_ts < since:
+                    continue
+                if until is not None and run_ts > until:
+                    # Los registros están en orden de tiempo: no queda nada en el rango
+                    return
+                
+                record = {'timestamp': run_ts, 'page': page}
+                if decode:
+                    record.update(json.loads(zlib.decompress(mm[start:offset]).decode('utf-8')))
+                yield record
+
+    def iter_runs(self, since=None, until=None):
+        """Agrupar los registros por verificación: (timestamp, [registros])"""
+        current_ts = None
+        records = []
+        for record in self.iter_records(since, until):
+            if records and record['timestamp'] != current_ts:
+                yield current_ts, records
+                records = []
+            current_ts = record['timestamp']
+            records.append(record)
+        if records:
+            yield current_ts, records
+
+    def course_history(self, text, since=None, until=None):
+        """Evolución de plazas de los cursos cuyo nombre contiene el texto dado"""
+        text = text.lower()
+        for record in self.iter_records(since, until):
+            for curso in record.get('response', {}).get('cursos', []) or []:
+                nombre = curso.get('nombre', '') or ''
+                if text not in nombre.lower():
+                    continue
+                grupo = curso.get('grupo_seleccionado') or {}
+                yield {
+                    'timestamp': record['timestamp'],
+                    'nombre': nombre,
+                    'capacidad': grupo.get('capacidad', 0),
+                    'ocupacion': grupo.get('ocupacion', 0)
+                }
+
+
+class ReplayResponse:
+    """Respuesta grabada con la interfaz mínima de requests.Response que usa el bot"""
+
+    def __init__(self, url, text='', data=None, status_code=200):
+        self.url = url
+        self.text = text if data is None else json.dumps(data, ensure_ascii=False)
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data if self._data is not None else json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} en {self.url}")
+
+
+class ReplaySession:
+    """Transporte nulo: sirve páginas grabadas en lugar del sitio real"""
+
+    DEFAULT_LOGIN_HTML = (
+        '<form action="/login">'
+        '<input type="hidden" name="next" value="/">'
+        '<input name="usuario"><input type="password" name="password">'
+        '</form>'
+    )
+
+    def __init__(self, pages, login_html=None, courses_html=None):
+        self.headers = {}
+        self.pages = pages
+        self.login_html = login_html or self.DEFAULT_LOGIN_HTML
+        self.courses_html = courses_html or ''
+
+    @staticmethod
+    def query_key(data):
+        """Clave de una consulta AJAX grabada (sin id_alumno)"""
+        return (
+            str(data.get('id_ensenanza', 0)),
+            str(data.get('id_producto', 0)),
+            str(data.get('search', '')),
+            str(data.get('fecha_filtro', '')),
+            int(data.get('pag', 0))
+        )
+
+    def get(self, url, **kwargs):
+        if 'venta_online/cursos' in url:
+            return ReplayResponse(url, self.courses_html)
+        return ReplayResponse(url, self.login_html)
+
+    def post(self, url, data=None, **kwargs):
+        if 'cursos_/' in url:
+            page = self.pages.get(self.query_key(data or {}), {'status': True, 'cursos': []})
+            return ReplayResponse(url, data=page)
+        return ReplayResponse(url, 'OK')
+
+
+def iter_replay_sessions(path):
+    """Generar (etiqueta, ReplaySession) por cada verificación grabada
+
+    Acepta un archivo histórico de CATALOG_ARCHIVE o un directorio con
+    login.html, cursos.html y pagina_<n>.json (respuestas de cursos_/).
+    Si el directorio contiene subdirectorios, cada uno es una verificación.
+    """
+    if os.path.isfile(path):
+        for run_ts, records in CatalogArchive(path).iter_runs():
+            pages = {ReplaySession.query_key(r['query']): r['response'] for r in records}
+            yield datetime.fromtimestamp(run_ts).strftime('%d/%m/%Y %H:%M:%S'), ReplaySession(pages)
+        return
+    
+    def read_text(directory, name):
+        for base in (directory, path):
+            file_path = os.path.join(base, name)
+            if os.path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    return f.read()
+        return None
+    
+    subdirs = sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d)))
+    run_dirs = [os.path.join(path, d) for d in subdirs] or [path]
+    
+    for run_dir in run_dirs:
+        pages = {}
+        for name in os.listdir(run_dir):
+            match = re.fullmatch(r'pagina_(\d+)\.json', name)
+            if match:
+                with open(os.path.join(run_dir, name), 'r', encoding='utf-8') as f:
+                    pages[ReplaySession.query_key({'pag': int(match.group(1))})] = json.load(f)
+        session = ReplaySession(pages, read_text(run_dir, 'login.html'), read_text(run_dir, 'cursos.html'))
+        yield os.path.basename(os.path.normpath(run_dir)), session
+
+
+# Normalización de títulos para eliminar duplicados
+TITLE_KEY_PATTERN = re.compile(r'[^a-zA-Z0-9]')
+
+
+def course_key(title):
+    """Clave de deduplicación de un curso (título sin símbolos ni espacios, en minúsculas)"""
+    return TITLE_KEY_PATTERN.sub('', title.lower())
+
+
+class CourseFilter:
+    """Reglas de filtrado declarativas compiladas en un único matcher
+
+    Todos los términos que se buscan en el nombre del curso (meses, años,
+    términos a incluir/excluir y excepciones) se combinan en una sola regex,
+    así que cada nombre se recorre una única vez sin importar cuántas
+    reglas haya.
+    """
+
+    DEFAULT_RULES = {
+        'meses': ['julio', 'agosto'],
+        'anios': ['2026', '2025'],
+        'incluir': [],
+        'excluir': {'terminos': ['semestre'], 'excepto': []},
+        'lugar': {'requerido': True, 'lugares': [], 'excepto': ['residencia tafira atlantic club']},
+        'plazas_minimas': 1,
+        'anio_aviso': None
+    }
+
+    # Meses que se reconocen en el nombre cuando las reglas no filtran por mes
+    MONTH_NAMES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+                   'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+    NO_MONTH = 'sin mes'
+
+    def __init__(self, rules=None):
+        self.validate(rules or {})
+        rules = {**self.DEFAULT_RULES, **(rules or {})}
+        excluir = {**self.DEFAULT_RULES['excluir'], **rules['excluir']}
+        lugar = {**self.DEFAULT_RULES['lugar'], **rules['lugar']}
+        
+        self.months = self._terms(rules['meses'])
+        self.years = self._terms(rules['anios'])
+        self.include_terms = self._terms(rules['incluir'])
+        self.exclude_terms = self._terms(excluir['terminos'])
+        self.exclude_exceptions = self._terms(excluir['excepto'])
+        self.require_lugar = bool(lugar['requerido'])
+        self.places = self._terms(lugar['lugares'])
+        self.lugar_exceptions = self._terms(lugar['excepto'])
+        self.min_seats = rules['plazas_minimas']
+        # Año que se muestra en los emails (por defecto, el primero de 'anios')
+        self.display_year = rules['anio_aviso'] or (self.years[0] if self.years else '')
+        
+        # Meses con los que se etiqueta cada curso (en orden de preferencia)
+        self.month_labels = self.months or self.MONTH_NAMES
+        
+        # Término → etiquetas de las reglas en las que aparece
+        self.term_tags = {}
+        for month in self.month_labels:
+            self._add(month, 'mes:' + month)
+        for year in self.years:
+            self._add(year, 'anio')
+        for term in self.include_terms:
+            self._add(term, 'incluir')
+        for term in self.exclude_terms:
+            self._add(term, 'excluir')
+        for term in self.exclude_exceptions:
+            self._add(term, 'excluir_excepto')
+        for term in self.lugar_exceptions:
+            self._add(term, 'lugar_excepto')
+        
+        # El lookahead solo captura el término más largo en cada posición, así que
+        # cada término hereda también las etiquetas de los términos que son prefijo suyo
+        self._tags = {
+            term: frozenset().union(*(tags for other, tags in self.term_tags.items() if term.startswith(other)))
+            for term in self.term_tags
+        }
+        alternation = '|'.join(re.escape(t) for t in sorted(self._tags, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternation}))') if alternation else None
+        
+        self._place_pattern = re.compile('|'.join(re.escape(p) for p in self.places)) if self.places else None
+
+
+    @staticmethod
+    def _terms(values):
+        return [v.lower().strip() for v in values if v and v.strip()]
+
+    def _add(self, term, tag):
+        self.term_tags.setdefault(term, set()).add(tag)
+
+    @classmethod
+    def validate(cls, rules):
+        """Comprobar los tipos de las reglas; lanza ValueError con el campo incorrecto"""
+        def check_list(value, field):
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"'{field}' debe ser una lista de textos")
+        
+        def check_section(section, field, list_fields):
+            value = rules.get(section, {})
+            if not isinstance(value, dict):
+                raise ValueError(f"'{section}' debe ser un objeto con {', '.join(list_fields)}")
+            for key in list_fields:
+                if key in value:
+                    check_list(value[key], f"{section}.{key}")
+            return value
+        
+        if not isinstance(rules, dict):
+            raise ValueError("las reglas deben ser un objeto JSON")
+        for field in ('meses', 'anios', 'incluir'):
+            if field in rules:
+                check_list(rules[field], field)
+        check_section('excluir', 'excluir', ['terminos', 'excepto'])
+        lugar = check_section('lugar', 'lugar', ['lugares', 'excepto'])
+        if 'requerido' in lugar and not isinstance(lugar['requerido'], bool):
+            raise ValueError("'lugar.requerido' debe ser true o false")
+        if 'plazas_minimas' in rules:
+            value = rules['plazas_minimas']
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("'plazas_minimas' debe ser un número")
+        if rules.get('anio_aviso') is not None and not isinstance(rules['anio_aviso'], str):
+            raise ValueError("'anio_aviso' debe ser un texto")
+
+    @classmethod
+    def from_file(cls, path):
+        """Cargar las reglas desde un JSON; sin archivo o con errores se usan las reglas por defecto"""
+        if not path or not os.path.exists(path):
+            logging.info("🧩 Usando reglas de filtrado por defecto")
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rules = json.load(f)
+            course_filter = cls(rules)
+        except (ValueError, OSError) as e:
+            logging.error(f"❌ Reglas de filtrado inválidas en {path}, se usan las reglas por defecto: {e}")
+            return cls()
+        logging.info(f"🧩 Reglas de filtrado cargadas desde {path}")
+        return course_filter
+
+    def describe(self):
+        """Resumen legible de las reglas para el log"""
+        parts = [
+            f"meses: {', '.join(self.months) or 'todos'}",
+            f"años: {', '.join(self.years) or 'todos'}"
+        ]
+        if self.include_terms:
+            parts.append(f"incluye: {', '.join(self.include_terms)}")
+        if self.exclude_terms:
+            excepto = f" (excepto {', '.join(self.exclude_exceptions)})" if self.exclude_exceptions else ''
+            parts.append(f"excluye: {', '.join(self.exclude_terms)}{excepto}")
+        if self.require_lugar:
+            lugares = f" en {', '.join(self.places)}" if self.places else ''
+            excepto = f" (excepto {', '.join(self.lugar_exceptions)})" if self.lugar_exceptions else ''
+            parts.append(f"lugar obligatorio{lugares}{excepto}")
+        parts.append(f"mínimo {self.min_seats} plazas")
+        return ' | '.join(parts)
+
+    def period_label(self, separator=' y '):
+        """Meses y año objetivo para los textos del email (p. ej. 'julio y agosto 2026')"""
+        months = separator.join(self.months) if self.months else 'todos los meses'
+        return f"{months} {self.display_year}".strip()
+
+    def scan(self, nombre_lower):
+        """Etiquetas de todas las reglas que aparecen en el nombre (una sola pasada)"""
+        hits = set()
+        if self._pattern:
+            for match in self._pattern.finditer(nombre_lower):
+                hits |= self._tags[match.group(1)]
+        return hits
+
+    def month_of(self, hits):
+        """Primer mes (en el orden de las reglas) presente en el nombre"""
+        for month in self.month_labels:
+            if 'mes:' + month in hits:
+                return month
+        return self.NO_MONTH
+
+    def rejection(self, hits):
+        """Motivo por el que el nombre no pasa las reglas, o None si las pasa"""
+        if self.months and not any('mes:' + month in hits for month in self.months):
+            return 'mes'
+        if self.years and 'anio' not in hits:
+            return 'anio'
+        if self.include_terms and 'incluir' not in hits:
+            return 'incluir'
+        if 'excluir' in hits and 'excluir_excepto' not in hits:
+            return 'excluir'
+        return None
+
+    def has_valid_lugar(self, grupos):
+        """Comprobar que algún grupo tiene lugar (y, si hay lista de lugares, que coincide)"""
+        for grupo in grupos or []:
+            lugar = grupo.get('lugar', '').strip()
+            if lugar and (not self._place_pattern or self._place_pattern.search(lugar.lower())):
+                return True
+        return False
+
+    def lugar_ok(self, hits, has_valid_lugar):
+        return not self.require_lugar or has_valid_lugar or 'lugar_excepto' in hits
+
+    def match_columns(self, names, has_valid_lugar):
+        """Versión vectorizada de rejection(), lugar_ok() y month_of() sobre columnas NumPy
+
+        Recibe el array de nombres en minúsculas y el de lugar válido; devuelve
+        la máscara de cursos que pasan las reglas (sin contar plazas) y el
+        índice en month_labels del mes de cada curso (-1 si no tiene).
+        """
+        size = len(names)
+        term_masks = {term: np.char.find(names, term) >= 0 for term in self.term_tags}
+        
+        def tag_mask(tag):
+            mask = np.zeros(size, dtype=bool)
+            for term, tags in self.term_tags.items():
+                if tag in tags:
+                    mask |= term_masks[term]
+            return mask
+        
+        month_masks = [tag_mask('mes:' + month) for month in self.month_labels]
+        
+        mask = np.ones(size, dtype=bool)
+        if self.months:
+            mask &= np.logical_or.reduce(month_masks[:len(self.months)])
+        if self.years:
+            mask &= tag_mask('anio')
+        if self.include_terms:
+            mask &= tag_mask('incluir')
+        mask &= ~(tag_mask('excluir') & ~tag_mask('excluir_excepto'))
+        if self.require_lugar:
+            mask &= has_valid_lugar | tag_mask('lugar_excepto')
+        
+        # El primer mes en orden de preferencia gana
+        month_index = np.full(size, -1)
+        for index in reversed(range(len(month_masks))):
+            month_index[month_masks[index]] = index
+        
+        return mask, month_index
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Sesión SMTP mínima que acepta y descarta los mensajes"""
+
+    def reply(self, line):
+        self.wfile.write(line + b'\r\n')
+
+    def handle(self):
+        self.reply(b'220 localhost StudiaBot SMTP sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            
+            if command.startswith((b'EHLO', b'HELO')):
+                self.reply(b'250 localhost')
+            elif command == b'DATA':
+                self.reply(b'354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line.rstrip(b'\r\n') == b'.':
+                        break
+                    size += len(data_line)
+                self.server.sink.record(size)
+                self.reply(b'250 OK')
+            elif command == b'QUIT':
+                self.reply(b'221 Bye')
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP...
+                self.reply(b'250 OK')
+
+
+class LocalSMTPSink:
+    """Servidor SMTP local de pruebas que cuenta los mensajes recibidos"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.server = socketserver.ThreadingTCPServer((host, port), _SMTPSinkHandler)
+        self.server.daemon_threads = True
+        self.server.sink = self
+        self.host, self.port = self.server.server_address[:2]
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def reset(self):
+        with self._lock:
+            self.messages = 0
+            self.bytes = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
 class StudiaBotDefinitivo:
     def __init__(self):
         # URLs y credenciales - FORZAR URL CORRECTA
@@ -50,10 +612,11 @@ class StudiaBotDefinitivo:
             self.email_to = []
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
+        self.smtp_starttls = os.getenv('SMTP_STARTTLS', 'true').lower() not in ('0', 'false', 'no')
         
-        # Configuración específica
-        self.target_months = ['julio', 'agosto']
-        self.target_year = '2026'
+        # Configuración específica: reglas de filtrado declarativas
+        self.rules_file = os.getenv('FILTER_RULES', 'filtros.json')
+        self.course_filter = CourseFilter.from_file(self.rules_file)
         
         # Session para cookies
         self.session = requests.Session()
@@ -69,6 +632,31 @@ class StudiaBotDefinitivo:
         
         # Archivo para guardar estado anterior
         self.state_file = 'cursos_anteriores.json'
+        
+        # Archivo histórico opcional con todas las páginas crudas
+        self.archive_file = os.getenv('CATALOG_ARCHIVE')
+        self.archive = CatalogArchive(self.archive_file) if self.archive_file else None
+        
+        # Consultas (slices) del catálogo a revisar en cada verificación
+        self.slices_file = os.getenv('QUERY_SLICES', 'consultas.json')
+        self.query_slices = self.load_query_slices()
+        self.query_workers = int(os.getenv('QUERY_WORKERS', '4'))
+        # Pool de conexiones suficiente para las consultas concurrentes
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self.query_workers, 10))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Filtro masivo por columnas (para catálogos muy grandes)
+        self.bulk_filter = os.getenv('BULK_FILTER', '').lower() in ('1', 'true', 'si', 'sí')
+        
+        # Consultas que no se pudieron recorrer completas en la última verificación
+        self.failed_slices = []
+        
+        # Enviar una alerta por página en cuanto se detectan cambios (en vez de una al final)
+        self.stream_alerts = os.getenv('STREAM_ALERTS', '').lower() in ('1', 'true', 'si', 'sí')
+        
+        # Modo replay: sin DNS, sin red ni email
+        self.offline = False
     
     def login(self):
         """Realizar login en StudiaOnline"""
@@ -76,15 +664,16 @@ class StudiaBotDefinitivo:
             logging.info("🔐 Iniciando proceso de login...")
             logging.info(f"🌐 URL base configurada: {self.base_url}")
             
-            # Verificación de DNS antes de intentar conexión
-            import socket
-            try:
-                domain = 'studiaonline.org'
-                ip_address = socket.gethostbyname(domain)
-                logging.info(f"🔍 DNS lookup para {domain}: {ip_address}")
-            except socket.gaierror as e:
-                logging.error(f"❌ Error de DNS para {domain}: {e}")
-                return False
+            # Verificación de DNS antes de intentar conexión (no aplica en modo replay)
+            if not self.offline:
+                import socket
+                try:
+                    domain = 'studiaonline.org'
+                    ip_address = socket.gethostbyname(domain)
+                    logging.info(f"🔍 DNS lookup para {domain}: {ip_address}")
+                except socket.gaierror as e:
+                    logging.error(f"❌ Error de DNS para {domain}: {e}")
+                    return False
             
             # Obtener página de login
             logging.info(f"📡 Conectando a: {self.base_url}")
@@ -194,8 +783,8 @@ class StudiaBotDefinitivo:
             except json.JSONDecodeError as e:
                 logging.warning(f"⚠️ LEGACY: JSON malformado, usando regex como backup: {e}")
                 logging.warning(f"⚠️ NOTA: El filtro de 'lugar vacío' solo se aplica con JSON válido")
-                # Fallback a regex si el JSON está malformado
-                course_pattern = r'"nombre":\s*"([^"]*(?:julio|agosto)[^"]*2026[^"]*)"[^}]*"grupo_seleccionado":\s*\{[^}]*"capacidad":\s*(\d+)[^}]*"ocupacion":\s*(\d+)'
+                # Fallback a regex si el JSON está malformado; el nombre se filtra con las mismas reglas
+                course_pattern = r'"nombre":\s*"([^"]*)"[^}]*"grupo_seleccionado":\s*\{[^}]*"capacidad":\s*(\d+)[^}]*"ocupacion":\s*(\d+)'
                 matches = re.finditer(course_pattern, html_content, re.IGNORECASE)
                 
                 for match in matches:
@@ -206,16 +795,11 @@ class StudiaBotDefinitivo:
                         
                         plazas_disponibles = capacidad - ocupacion
                         
-                        # Verificar que NO es un semestre
-                        is_not_semestre = 'semestre' not in nombre.lower()
+                        hits = self.course_filter.scan(nombre.lower())
                         
-                        if plazas_disponibles > 0 and is_not_semestre:
-                            nombre_limpio = nombre.replace('Curso anual estudios n - ', '')
-                            nombre_limpio = nombre_limpio.replace('Curso anual Repaso n - ', '')
-                            nombre_limpio = nombre_limpio.split(' - mEf')[0]
-                            nombre_limpio = nombre_limpio.split(' -dlmEf')[0]
-                            nombre_limpio = re.sub(r'\s+', ' ', nombre_limpio).strip()
-                            month = 'julio' if 'julio' in nombre.lower() else 'agosto'
+                        if plazas_disponibles >= self.course_filter.min_seats and self.course_filter.rejection(hits) is None:
+                            nombre_limpio = self.clean_course_name(nombre)
+                            month = self.course_filter.month_of(hits)
                             
                             course_info = {
                                 'title': nombre_limpio,
@@ -238,7 +822,7 @@ class StudiaBotDefinitivo:
             seen_titles = set()
             
             for course in courses:
-                title_key = re.sub(r'[^a-zA-Z0-9]', '', course['title'].lower())
+                title_key = course_key(course['title'])
                 if title_key not in seen_titles:
                     seen_titles.add(title_key)
                     unique_courses.append(course)
@@ -250,115 +834,361 @@ class StudiaBotDefinitivo:
             logging.error(f"❌ Error extrayendo cursos LEGACY: {e}")
             return []
     
-    def get_available_courses(self):
-        """Obtener cursos con plazas disponibles de todas las páginas"""
+    DEFAULT_SLICE = {'id_ensenanza': 0, 'id_producto': 0, 'search': '', 'fecha_filtro': ''}
+    
+    def load_query_slices(self):
+        """Cargar las consultas a revisar; sin archivo se revisa todo el catálogo"""
         try:
-            # Login
-            if not self.login():
-                return []
-
-            # Acceder a la página de cursos principal para obtener la sesión
-            courses_url = urljoin(self.base_url, '/studiapy3/venta_online/cursos')
-            logging.info(f"🔍 Accediendo a página de cursos: {courses_url}")
+            if not os.path.exists(self.slices_file):
+                return [dict(self.DEFAULT_SLICE)]
             
-            response = self.session.get(courses_url, timeout=30)
+            with open(self.slices_file, 'r', encoding='utf-8') as f:
+                slices = json.load(f)
             
-            if response.status_code != 200:
-                logging.error(f"❌ Error accediendo a cursos: {response.status_code}")
-                return []
+            slices = [{**self.DEFAULT_SLICE, **query_slice} for query_slice in slices]
+            logging.info(f"🗂️ {len(slices)} consultas cargadas desde {self.slices_file}")
+            return slices or [dict(self.DEFAULT_SLICE)]
+            
+        except Exception as e:
+            logging.error(f"❌ Error cargando consultas, se revisa todo el catálogo: {e}")
+            return [dict(self.DEFAULT_SLICE)]
+    
+    def slice_label(self, index, query_slice):
+        """Nombre de una consulta para los logs: número y nombre, búsqueda o parámetros propios"""
+        name = query_slice.get('nombre') or query_slice.get('search')
+        if not name:
+            name = ', '.join(f"{key}={query_slice.get(key)}" for key, value in self.DEFAULT_SLICE.items()
+                             if query_slice.get(key) != value) or 'catálogo'
+        return f"consulta {index + 1}: {name}"
+    
+    def iter_page_batches(self):
+        """Generar, página a página, los cursos con plazas de todas las consultas
+
+        Las páginas se entregan en cuanto están filtradas y siempre en el
+        orden de las consultas. Las consultas que no se pudieron recorrer
+        completas quedan en self.failed_slices.
+        """
+        self.failed_slices = []
+        
+        # Login
+        if not self.login():
+            self.failed_slices.append('login')
+            return
 
-            # Obtener el id_alumno de la página inicial
-            id_alumno_match = re.search(r'id_alumno:\s*(\d+)', response.text)
-            id_alumno = int(id_alumno_match.group(1)) if id_alumno_match else 6861
+        # Acceder a la página de cursos principal para obtener la sesión
+        courses_url = urljoin(self.base_url, '/studiapy3/venta_online/cursos')
+        logging.info(f"🔍 Accediendo a página de cursos: {courses_url}")
+        
+        response = self.session.get(courses_url, timeout=30)
+        
+        if response.status_code != 200:
+            logging.error(f"❌ Error accediendo a cursos: {response.status_code}")
+            self.failed_slices.append('cursos')
+            return
+
+        # Obtener el id_alumno de la página inicial
+        id_alumno_match = re.search(r'id_alumno:\s*(\d+)', response.text)
+        id_alumno = int(id_alumno_match.group(1)) if id_alumno_match else 6861
+        
+        run_ts = time.time()
+        
+        logging.info("🌍 Filtros desactivados: buscando en TODOS los centros y regiones")
+        logging.info(f"🧩 Reglas: {self.course_filter.describe()}")
+        
+        if len(self.query_slices) == 1:
+            query_slice = self.query_slices[0]
+            yield from self.iter_slice_pages(query_slice, self.slice_label(0, query_slice), id_alumno, run_ts)
+            return
+        
+        # Varias consultas: cada hilo recorre una y deja sus páginas en su propia cola acotada.
+        # Las colas se leen en el orden de las consultas; un hilo que va por delante se
+        # bloquea al llenar la suya, así que nunca hay más de unas pocas páginas por hilo
+        # esperando. Los hilos cogen las consultas en orden, así que la que se está leyendo
+        # siempre tiene un hilo asignado
+        workers = max(1, min(self.query_workers, len(self.query_slices)))
+        logging.info(f"🗂️ Revisando {len(self.query_slices)} consultas en paralelo ({workers} hilos)")
+        slice_pages = [queue.Queue(maxsize=2) for _ in self.query_slices]
+        stop = threading.Event()
+        
+        def put(pages, item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce(index, query_slice):
+            if stop.is_set():
+                return
+            pages = slice_pages[index]
+            label = self.slice_label(index, query_slice)
+            try:
+                for batch in self.iter_slice_pages(query_slice, label, id_alumno, run_ts):
+                    if not put(pages, batch):
+                        return
+            except Exception as e:
+                # Una consulta fallida no interrumpe las demás
+                logging.error(f"❌ [{label}] Error en la consulta: {e}")
+                self.failed_slices.append(label)
+            finally:
+                put(pages, None)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, query_slice in enumerate(self.query_slices):
+                executor.submit(produce, index, query_slice)
+            try:
+                for pages in slice_pages:
+                    while True:
+                        batch = pages.get()
+                        if batch is None:
+                            break
+                        yield batch
+            finally:
+                stop.set()
+    
+    def iter_available_courses(self):
+        """Generar por página los cursos con plazas aún no vistos en esta verificación"""
+        # Título -> clave normalizada: cada título distinto se normaliza una sola vez
+        # por verificación, aunque aparezca en varias consultas
+        title_keys = {}
+        seen_titles = set()
+        total = 0
+        
+        for batch in self.iter_page_batches():
+            unique_courses = []
+            for course in batch:
+                title = course['title']
+                title_key = title_keys.get(title)
+                if title_key is None:
+                    title_key = title_keys[title] = course_key(title)
+                if title_key not in seen_titles:
+                    seen_titles.add(title_key)
+                    unique_courses.append(course)
             
-            all_courses = []
-            page = 0
+            total += len(unique_courses)
+            if unique_courses:
+                yield unique_courses
+        
+        logging.info(f"📊 Total cursos únicos con plazas: {total}")
+    
+    def get_available_courses(self):
+        """Obtener cursos con plazas disponibles de todas las páginas de todas las consultas"""
+        try:
+            return [course for batch in self.iter_available_courses() for course in batch]
             
-            logging.info("🌍 Filtros desactivados: buscando en TODOS los centros y regiones")
-            logging.info("🚫 Excluyendo: cursos de 'Semestre' y lugares vacíos")
+        except Exception as e:
+            logging.error(f"❌ Error obteniendo cursos: {e}")
+            return []
+    
+    def iter_slice_pages(self, query_slice, label, id_alumno, run_ts):
+        """Recorrer las páginas de una consulta, generando los cursos con plazas de cada una"""
+        page = 0
+        
+        # Explorar todas las páginas
+        while True:
+            logging.info(f"📄 [{label}] Explorando página {page + 1}...")
+            
+            # URL para cargar cursos vía AJAX
+            ajax_url = urljoin(self.base_url, '/studiapy3/venta_online/cursos/cursos_/')
+            
+            # Datos para el POST AJAX
+            ajax_data = {
+                'rp': 10,  # results per page
+                'pag': page,
+                'id_ensenanza': query_slice['id_ensenanza'],
+                'id_producto': query_slice['id_producto'],
+                'search': query_slice['search'],
+                'centro_alumno': False,  # ❌ Desmarcar "Solo de mi centro"
+                'fecha_filtro': query_slice['fecha_filtro'],
+                'id_alumno': id_alumno,
+                'order_by': 'fecha',
+                'puedo_cursar': '',
+                'region_alumno': False  # ❌ Desmarcar "Solo de mi región"
+            }
+            
+            # Realizar petición AJAX
+            try:
+                ajax_response = self.session.post(ajax_url, data=ajax_data, timeout=30)
+            except Exception as e:
+                logging.error(f"❌ [{label}] Error de conexión en AJAX página {page}: {e}")
+                self.failed_slices.append(label)
+                break
             
-            # Explorar todas las páginas
-            while True:
-                logging.info(f"📄 Explorando página {page + 1}...")
-                
-                # URL para cargar cursos vía AJAX
-                ajax_url = urljoin(self.base_url, '/studiapy3/venta_online/cursos/cursos_/')
+            if ajax_response.status_code != 200:
+                logging.error(f"❌ [{label}] Error en AJAX página {page}: {ajax_response.status_code}")
+                self.failed_slices.append(label)
+                break
+            
+            try:
+                ajax_json = ajax_response.json()
+                self.archive_snapshot(run_ts, page, ajax_data, ajax_json)
                 
-                # Datos para el POST AJAX
-                ajax_data = {
-                    'rp': 10,  # results per page
-                    'pag': page,
-                    'id_ensenanza': 0,
-                    'id_producto': 0,
-                    'search': '',
-                    'centro_alumno': False,  # ❌ Desmarcar "Solo de mi centro"
-                    'fecha_filtro': '',
-                    'id_alumno': id_alumno,
-                    'order_by': 'fecha',
-                    'puedo_cursar': '',
-                    'region_alumno': False  # ❌ Desmarcar "Solo de mi región"
-                }
+                if not ajax_json.get('status', False):
+                    logging.warning(f"⚠️ [{label}] AJAX sin status en página {page}")
+                    self.failed_slices.append(label)
+                    break
                 
-                # Realizar petición AJAX
-                ajax_response = self.session.post(ajax_url, data=ajax_data, timeout=30)
+                page_courses = ajax_json.get('cursos', [])
+                total_cursos = ajax_json.get('total_cursos', 0)
                 
-                if ajax_response.status_code != 200:
-                    logging.error(f"❌ Error en AJAX página {page}: {ajax_response.status_code}")
+                if not page_courses:
+                    logging.info(f"📄 [{label}] Página {page + 1} sin cursos, fin de paginación")
                     break
                 
-                try:
-                    ajax_json = ajax_response.json()
-                    
-                    if not ajax_json.get('status', False):
-                        logging.warning(f"⚠️ AJAX sin status en página {page}")
-                        break
-                    
-                    page_courses = ajax_json.get('cursos', [])
-                    total_cursos = ajax_json.get('total_cursos', 0)
-                    
-                    if not page_courses:
-                        logging.info(f"📄 Página {page + 1} sin cursos, fin de paginación")
-                        break
-                    
-                    logging.info(f"📄 Página {page + 1}: {len(page_courses)} cursos, total disponible: {total_cursos}")
-                    
-                    # Procesar cursos de esta página
+                logging.info(f"📄 [{label}] Página {page + 1}: {len(page_courses)} cursos, total disponible: {total_cursos}")
+                
+                # Procesar cursos de esta página
+                if self.bulk_filter:
+                    page_available_courses = self.extract_courses_bulk(page_courses)
+                else:
                     page_available_courses = self.extract_courses_from_json(page_courses)
-                    all_courses.extend(page_available_courses)
-                    
-                    # Si esta página tiene menos de 10 cursos, es la última
-                    if len(page_courses) < 10:
-                        logging.info(f"📄 Última página detectada (solo {len(page_courses)} cursos)")
-                        break
-                    
-                    page += 1
+                
+                # Si esta página tiene menos de 10 cursos, es la última
+                is_last_page = len(page_courses) < 10
+                if is_last_page:
+                    logging.info(f"📄 [{label}] Última página detectada (solo {len(page_courses)} cursos)")
                     
-                    # Seguridad: máximo 10 páginas
-                    if page >= 10:
-                        logging.warning("⚠️ Límite de 10 páginas alcanzado")
-                        break
-                        
-                except Exception as e:
-                    logging.error(f"❌ Error procesando AJAX página {page}: {e}")
-                    break
+            except Exception as e:
+                logging.error(f"❌ [{label}] Error procesando AJAX página {page}: {e}")
+                self.failed_slices.append(label)
+                break
+            
+            # Entregar la página en cuanto está filtrada (fuera del try: los errores del consumidor no son de AJAX)
+            yield page_available_courses
+            
+            if is_last_page:
+                break
+            
+            page += 1
+            
+            # Seguridad: máximo 10 páginas
+            if page >= 10:
+                logging.warning(f"⚠️ [{label}] Límite de 10 páginas alcanzado")
+                break
+        
+        logging.info(f"📊 [{label}] Páginas exploradas: {page + 1}")
+    
+    def iter_archive_availability(self, since=None, until=None):
+        """Cursos con plazas de cada verificación archivada: (timestamp, cursos)
+
+        Junta todas las páginas de una verificación y las filtra con
+        extract_courses_bulk() de una sola vez, que es donde el filtro por
+        columnas compensa (en páginas de 10 cursos no es más rápido).
+        """
+        for run_ts, records in self.archive.iter_runs(since, until):
+            cursos = [curso for record in records
+                      for curso in (record.get('response') or {}).get('cursos', []) or []]
             
-            # Eliminar duplicados finales
             unique_courses = []
             seen_titles = set()
-            
-            for course in all_courses:
-                title_key = re.sub(r'[^a-zA-Z0-9]', '', course['title'].lower())
+            for course in self.extract_courses_bulk(cursos):
+                title_key = course_key(course['title'])
                 if title_key not in seen_titles:
                     seen_titles.add(title_key)
                     unique_courses.append(course)
             
-            logging.info(f"📊 Total páginas exploradas: {page + 1}")
-            logging.info(f"📊 Total cursos únicos con plazas: {len(unique_courses)}")
+            yield run_ts, unique_courses
+    
+    def archive_snapshot(self, run_ts, page, ajax_data, ajax_json):
+        """Guardar la página cruda en el archivo histórico (si está activado)"""
+        if not self.archive:
+            return
+        try:
+            self.archive.append(run_ts, page, ajax_data, ajax_json)
+        except Exception as e:
+            # No es crítico, la verificación continúa
+            logging.warning(f"⚠️ Error guardando página {page} en el histórico: {e}")
+    
+    def clean_course_name(self, nombre):
+        """Limpiar prefijos, sufijos internos y espacios del nombre del curso"""
+        nombre_limpio = nombre.replace('Curso anual estudios n - ', '')
+        nombre_limpio = nombre_limpio.replace('Curso anual Repaso n - ', '')
+        nombre_limpio = nombre_limpio.split(' - mEf')[0]
+        nombre_limpio = nombre_limpio.split(' -dlmEf')[0]
+        return re.sub(r'\s+', ' ', nombre_limpio).strip()
+    
+    def extract_courses_bulk(self, cursos_data):
+        """Extraer cursos con plazas evaluando los filtros como máscaras sobre columnas
+
+        Con NumPy cada término de las reglas se busca de una vez en todo el
+        array de nombres y las reglas se combinan como máscaras; sin NumPy se
+        usa el matcher compilado curso a curso. Devuelve exactamente lo mismo
+        que extract_courses_from_json(), pero sin logging por curso.
+        """
+        try:
+            course_filter = self.course_filter
+            nombres = []
+            nombres_lower = []
+            capacidades = []
+            ocupaciones = []
+            plazas = []
+            lugar_valido = []
+            
+            # Pasar a columnas; los cursos que fallarían en el camino escalar se descartan aquí
+            for curso in cursos_data:
+                try:
+                    nombre = curso.get('nombre', '')
+                    grupo_seleccionado = curso.get('grupo_seleccionado', {})
+                    if not grupo_seleccionado:
+                        continue
+                    
+                    capacidad = grupo_seleccionado.get('capacidad', 0)
+                    ocupacion = grupo_seleccionado.get('ocupacion', 0)
+                    has_valid_lugar = course_filter.has_valid_lugar(curso.get('grupos', []))
+                    nombre_lower = nombre.lower()
+                    plazas_disponibles = capacidad - ocupacion
+                    plazas_float = float(plazas_disponibles)
+                except Exception as e:
+                    logging.debug(f"Error procesando curso individual: {e}")
+                    continue
+                
+                nombres.append(nombre)
+                nombres_lower.append(nombre_lower)
+                capacidades.append(capacidad)
+                ocupaciones.append(ocupacion)
+                plazas.append(plazas_float)
+                lugar_valido.append(has_valid_lugar)
+            
+            if np is not None:
+                rules_mask, month_index = course_filter.match_columns(
+                    np.array(nombres_lower, dtype=str), np.array(lugar_valido, dtype=bool))
+                mask = rules_mask & (np.array(plazas, dtype=float) >= course_filter.min_seats)
+                selected = np.flatnonzero(mask).tolist()
+                months = {
+                    i: course_filter.month_labels[month_index[i]] if month_index[i] >= 0 else course_filter.NO_MONTH
+                    for i in selected
+                }
+            else:
+                selected = []
+                months = {}
+                for i, nombre_lower in enumerate(nombres_lower):
+                    hits = course_filter.scan(nombre_lower)
+                    if (course_filter.rejection(hits) is None
+                            and course_filter.lugar_ok(hits, lugar_valido[i])
+                            and plazas[i] >= course_filter.min_seats):
+                        selected.append(i)
+                        months[i] = course_filter.month_of(hits)
+            
+            courses = []
+            for i in selected:
+                capacidad = capacidades[i]
+                ocupacion = ocupaciones[i]
+                courses.append({
+                    'title': self.clean_course_name(nombres[i]),
+                    'month': months[i],
+                    'capacidad': capacidad,
+                    'ocupacion': ocupacion,
+                    'plazas_disponibles': capacidad - ocupacion,
+                    'available': True
+                })
             
-            return unique_courses
+            logging.info(f"⚡ Filtro masivo: {len(courses)} de {len(cursos_data)} cursos con plazas")
+            return courses
             
         except Exception as e:
-            logging.error(f"❌ Error obteniendo cursos: {e}")
+            logging.error(f"❌ Error en filtro masivo de cursos: {e}")
             return []
     
     def extract_courses_from_json(self, cursos_data):
@@ -378,40 +1208,25 @@ class StudiaBotDefinitivo:
                     ocupacion = grupo_seleccionado.get('ocupacion', 0)
                     
                     # Verificar que grupos.lugar no esté vacío
-                    grupos = curso.get('grupos', [])
-                    has_valid_lugar = False
-                    if grupos:
-                        for grupo in grupos:
-                            lugar = grupo.get('lugar', '').strip()
-                            if lugar:  # Si hay al menos un lugar no vacío
-                                has_valid_lugar = True
-                                break
+                    has_valid_lugar = self.course_filter.has_valid_lugar(curso.get('grupos', []))
                     
-                    # Excepción especial: permitir "Residencia Tafira Atlantic Club" aunque el lugar esté vacío
-                    is_tafira_exception = 'residencia tafira atlantic club' in nombre.lower()
+                    # Reglas sobre el nombre (mes, año, incluir/excluir y excepciones) en una sola pasada
+                    hits = self.course_filter.scan(nombre.lower())
+                    rejection = self.course_filter.rejection(hits)
                     
-                    # Verificar que es de julio o agosto 2026, NO es un semestre y tiene lugar válido
-                    is_target_month = any(month in nombre.lower() for month in self.target_months)
-                    is_target_year = '2026' in nombre or '2025' in nombre
-                    is_not_semestre = 'semestre' not in nombre.lower()
-                    
-                    if is_target_month and is_target_year and is_not_semestre and (has_valid_lugar or is_tafira_exception):
+                    if rejection is None and self.course_filter.lugar_ok(hits, has_valid_lugar):
                         plazas_disponibles = capacidad - ocupacion
                         
                         # Limpiar nombre completamente
-                        nombre_limpio = nombre.replace('Curso anual estudios n - ', '')
-                        nombre_limpio = nombre_limpio.replace('Curso anual Repaso n - ', '')
-                        nombre_limpio = nombre_limpio.split(' - mEf')[0]
-                        nombre_limpio = nombre_limpio.split(' -dlmEf')[0]
-                        nombre_limpio = re.sub(r'\s+', ' ', nombre_limpio).strip()
+                        nombre_limpio = self.clean_course_name(nombre)
                         
                         # Determinar mes
-                        month = 'julio' if 'julio' in nombre.lower() else 'agosto'
+                        month = self.course_filter.month_of(hits)
                         
                         logging.info(f"🔍 Curso encontrado: {nombre_limpio}")
                         logging.info(f"   📊 {ocupacion}/{capacidad} → {plazas_disponibles} plazas libres")
                         
-                        if plazas_disponibles > 0:
+                        if plazas_disponibles >= self.course_filter.min_seats:
                             course_info = {
                                 'title': nombre_limpio,
                                 'month': month,
@@ -427,8 +1242,8 @@ class StudiaBotDefinitivo:
                             logging.info(f"❌ SIN PLAZAS: {nombre_limpio} (completo)")
                     else:
                         # Si no pasa los filtros, registrar por qué
-                        if 'semestre' in nombre.lower():
-                            logging.info(f"🚫 EXCLUIDO: {nombre} (curso de semestre)")
+                        if rejection == 'excluir':
+                            logging.info(f"🚫 EXCLUIDO: {nombre} (término excluido)")
                         elif not has_valid_lugar:
                             logging.info(f"🚫 EXCLUIDO: {nombre} (lugar vacío)")
                         # No logear si es por mes/año incorrectos para evitar spam
@@ -443,20 +1258,27 @@ class StudiaBotDefinitivo:
             logging.error(f"❌ Error extrayendo cursos de JSON: {e}")
             return []
     
+    def build_courses_state(self, courses):
+        """Construir el estado de cursos indexado por nombre y mes"""
+        # Crear un identificador único para cada curso basado en nombre y mes
+        course_ids = {}
+        for course in courses:
+            course_id = f"{course['title']}_{course['month']}"
+            course_ids[course_id] = {
+                'title': course['title'],
+                'month': course['month'],
+                'plazas_disponibles': course['plazas_disponibles'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return course_ids
+    
     def save_courses_state(self, courses):
         """Guardar estado actual de cursos en archivo JSON"""
+        self.write_courses_state(self.build_courses_state(courses))
+    
+    def write_courses_state(self, course_ids):
+        """Escribir en el archivo JSON un estado ya indexado por nombre y mes"""
         try:
-            # Crear un identificador único para cada curso basado en nombre y mes
-            course_ids = {}
-            for course in courses:
-                course_id = f"{course['title']}_{course['month']}"
-                course_ids[course_id] = {
-                    'title': course['title'],
-                    'month': course['month'],
-                    'plazas_disponibles': course['plazas_disponibles'],
-                    'timestamp': datetime.now().isoformat()
-                }
-            
             with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(course_ids, f, ensure_ascii=False, indent=2)
             
@@ -554,62 +1376,74 @@ class StudiaBotDefinitivo:
         
         return new_courses
     
+    def build_clean_email(self, courses):
+        """Construir el email con formato limpio y simple"""
+        period = self.course_filter.period_label()
+        year = self.course_filter.display_year
+        
+        msg = MIMEMultipart()
+        msg['From'] = self.email_from
+        msg['To'] = ', '.join(self.email_to)  # Unir múltiples destinatarios con comas
+        msg['Subject'] = f"StudiaOnline - Cursos Disponibles {self.course_filter.period_label('/').title()} ({datetime.now().strftime('%d/%m/%Y')})"
+        
+        if courses:
+            body = "🎓 CURSOS CON PLAZAS DISPONIBLES\n"
+            body += f"📅 {period.upper()}\n"
+            body += "=" * 50 + "\n\n"
+            
+            # Separar por mes (en el orden de las reglas, y después cualquier otro)
+            by_month = {month: [] for month in self.course_filter.month_labels}
+            for course in courses:
+                by_month.setdefault(course['month'], []).append(course)
+            
+            for month, month_courses in by_month.items():
+                if not month_courses:
+                    continue
+                body += f"📅 {month.upper()} {year}".rstrip() + "\n"
+                body += "-" * 20 + "\n"
+                for i, course in enumerate(month_courses, 1):
+                    body += f"{i}. {course['title']}\n"
+                body += "\n"
+            
+            # Resumen simple
+            summary = ', '.join(f"{len(month_courses)} en {month}"
+                                for month, month_courses in by_month.items() if month_courses)
+            body += f"Total: {len(courses)} cursos con plazas libres\n"
+            body += f"({summary})\n\n"
+            body += f"Búsqueda: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
+            body += "🔗 https://studiaonline.org/"
+            
+        else:
+            body = "📋 REVISIÓN STUDIAONLINE\n"
+            body += "=" * 30 + "\n\n"
+            body += "❌ No hay cursos con plazas disponibles\n"
+            body += f"   para {period}\n\n"
+            body += f"Búsqueda: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
+            body += "📧 Te notificaré cuando haya plazas"
+        
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        return msg
+    
+    def deliver_email(self, msg):
+        """Enviar un mensaje ya construido a todos los destinatarios por SMTP"""
+        # Serializar una sola vez, no una vez por destinatario
+        message = msg.as_string()
+        with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            if self.smtp_starttls:
+                server.starttls()
+            if self.email_password:
+                server.login(self.email_from, self.email_password)
+            # Enviar a todos los destinatarios
+            for recipient in self.email_to:
+                server.sendmail(self.email_from, recipient, message)
+    
     def send_clean_email(self, courses):
         """Enviar email con formato limpio y simple"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.email_from
-            msg['To'] = ', '.join(self.email_to)  # Unir múltiples destinatarios con comas
-            msg['Subject'] = f"StudiaOnline - Cursos Disponibles Julio/Agosto 2026 ({datetime.now().strftime('%d/%m/%Y')})"
-            
-            if courses:
-                body = "🎓 CURSOS CON PLAZAS DISPONIBLES\n"
-                body += "📅 JULIO Y AGOSTO 2026\n"
-                body += "=" * 50 + "\n\n"
-                
-                # Separar por mes
-                julio_courses = [c for c in courses if c['month'] == 'julio']
-                agosto_courses = [c for c in courses if c['month'] == 'agosto']
-                
-                # Cursos de JULIO
-                if julio_courses:
-                    body += "📅 JULIO 2026\n"
-                    body += "-" * 20 + "\n"
-                    for i, course in enumerate(julio_courses, 1):
-                        body += f"{i}. {course['title']}\n"
-                    body += "\n"
-                
-                # Cursos de AGOSTO
-                if agosto_courses:
-                    body += "📅 AGOSTO 2026\n"
-                    body += "-" * 20 + "\n"
-                    for i, course in enumerate(agosto_courses, 1):
-                        body += f"{i}. {course['title']}\n"
-                    body += "\n"
-                
-                # Resumen simple
-                body += f"Total: {len(courses)} cursos con plazas libres\n"
-                body += f"({len(julio_courses)} en julio, {len(agosto_courses)} en agosto)\n\n"
-                body += f"Búsqueda: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
-                body += "🔗 https://studiaonline.org/"
-                
-            else:
-                body = "📋 REVISIÓN STUDIAONLINE\n"
-                body += "=" * 30 + "\n\n"
-                body += "❌ No hay cursos con plazas disponibles\n"
-                body += "   para julio y agosto 2026\n\n"
-                body += f"Búsqueda: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
-                body += "📧 Te notificaré cuando haya plazas"
-            
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
+            msg = self.build_clean_email(courses)
             
             # Enviar email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_from, self.email_password)
-                # Enviar a todos los destinatarios
-                for recipient in self.email_to:
-                    server.sendmail(self.email_from, recipient, msg.as_string())
+            self.deliver_email(msg)
             
             logging.info(f"📧 Email enviado a {len(self.email_to)} destinatarios: {len(courses)} cursos con plazas")
             return True
@@ -618,48 +1452,48 @@ class StudiaBotDefinitivo:
             logging.error(f"❌ Error enviando email: {e}")
             return False
     
+    def build_changes_email(self, new_courses):
+        """Construir el email de alerta con los cursos nuevos o con más plazas"""
+        msg = MIMEMultipart()
+        msg['From'] = self.email_from
+        msg['To'] = ', '.join(self.email_to)  # Unir múltiples destinatarios con comas
+        msg['Subject'] = f"🚨 StudiaOnline - NUEVAS PLAZAS DISPONIBLES! ({datetime.now().strftime('%d/%m %H:%M')})"
+        
+        body = "🚨 ¡ALERTA DE PLAZAS!\n"
+        body += "=" * 30 + "\n\n"
+        
+        # Separar por tipo de cambio
+        nuevos = [c for c in new_courses if c.get('status') == 'nuevo']
+        mas_plazas = [c for c in new_courses if c.get('status') == 'mas_plazas']
+        
+        if nuevos:
+            body += "🆕 CURSOS NUEVOS CON PLAZAS:\n"
+            body += "-" * 30 + "\n"
+            for course in nuevos:
+                body += f"📅 {course['month'].upper()}: {course['title']}\n"
+                body += f"   🎯 {course['plazas_disponibles']} plazas disponibles\n\n"
+        
+        if mas_plazas:
+            body += "📈 CURSOS CON MÁS PLAZAS:\n"
+            body += "-" * 30 + "\n"
+            for course in mas_plazas:
+                body += f"📅 {course['month'].upper()}: {course['title']}\n"
+                body += f"   📈 {course['plazas_anteriores']} → {course['plazas_disponibles']} plazas\n\n"
+        
+        body += f"🕐 Verificado: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
+        body += "🔄 Próxima verificación en 10 minutos\n\n"
+        body += "💡 Bot monitoreando automáticamente cada 10 minutos"
+        
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        return msg
+    
     def send_changes_email(self, new_courses):
         """Enviar email solo cuando hay cursos nuevos o cambios"""
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.email_from
-            msg['To'] = ', '.join(self.email_to)  # Unir múltiples destinatarios con comas
-            msg['Subject'] = f"🚨 StudiaOnline - NUEVAS PLAZAS DISPONIBLES! ({datetime.now().strftime('%d/%m %H:%M')})"
-            
-            body = "🚨 ¡ALERTA DE PLAZAS!\n"
-            body += "=" * 30 + "\n\n"
-            
-            # Separar por tipo de cambio
-            nuevos = [c for c in new_courses if c.get('status') == 'nuevo']
-            mas_plazas = [c for c in new_courses if c.get('status') == 'mas_plazas']
-            
-            if nuevos:
-                body += "🆕 CURSOS NUEVOS CON PLAZAS:\n"
-                body += "-" * 30 + "\n"
-                for course in nuevos:
-                    body += f"📅 {course['month'].upper()}: {course['title']}\n"
-                    body += f"   🎯 {course['plazas_disponibles']} plazas disponibles\n\n"
-            
-            if mas_plazas:
-                body += "📈 CURSOS CON MÁS PLAZAS:\n"
-                body += "-" * 30 + "\n"
-                for course in mas_plazas:
-                    body += f"📅 {course['month'].upper()}: {course['title']}\n"
-                    body += f"   📈 {course['plazas_anteriores']} → {course['plazas_disponibles']} plazas\n\n"
-            
-            body += f"🕐 Verificado: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
-            body += "🔄 Próxima verificación en 10 minutos\n\n"
-            body += "💡 Bot monitoreando automáticamente cada 10 minutos"
-            
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
+            msg = self.build_changes_email(new_courses)
             
             # Enviar email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.email_from, self.email_password)
-                # Enviar a todos los destinatarios
-                for recipient in self.email_to:
-                    server.sendmail(self.email_from, recipient, msg.as_string())
+            self.deliver_email(msg)
             
             logging.info(f"🚨 Email de ALERTA enviado a {len(self.email_to)} destinatarios: {len(new_courses)} cambios detectados")
             return True
@@ -668,6 +1502,61 @@ class StudiaBotDefinitivo:
             logging.error(f"❌ Error enviando email de alerta: {e}")
             return False
     
+    def check_courses(self, previous_state, notify):
+        """Procesar una verificación página a página: nuevo estado y aviso de cambios
+
+        notify(new_courses) recibe los cambios de cada página si STREAM_ALERTS
+        está activo, o todos juntos al final si no. Si la verificación queda
+        incompleta, el estado conserva los cursos anteriores no revisados.
+        Devuelve (estado, cursos con plazas encontrados, cambios).
+        """
+        current_state = {}
+        pending_alerts = []
+        total_changes = 0
+        fetch_failed = False
+        
+        try:
+            for batch in self.iter_available_courses():
+                for course in batch:
+                    logging.info(f"   {len(current_state) + 1}. {course['title']}")
+                    logging.info(f"      📅 {course['month'].title()} | 🎯 {course['plazas_disponibles']} plazas libres")
+                    current_state.update(self.build_courses_state([course]))
+                
+                # Buscar cambios de esta página
+                new_courses = self.find_new_courses(batch, previous_state)
+                total_changes += len(new_courses)
+                
+                if new_courses and self.stream_alerts:
+                    # Avisar ya de esta página, sin esperar al resto
+                    notify(new_courses)
+                else:
+                    pending_alerts.extend(new_courses)
+        except Exception as e:
+            logging.error(f"❌ Error obteniendo cursos: {e}")
+            fetch_failed = True
+        
+        found = len(current_state)
+        if current_state:
+            logging.info(f"✅ CURSOS ACTUALES ({found})")
+            
+            if pending_alerts:
+                notify(pending_alerts)
+            elif not total_changes:
+                logging.info("ℹ️ Sin cambios desde la última verificación")
+        else:
+            logging.info("ℹ️ No hay cursos con plazas disponibles")
+        
+        if fetch_failed or self.failed_slices:
+            # Verificación incompleta (login, conexión o consulta fallida): conservar lo que
+            # no se ha podido revisar, para que no vuelva a aparecer como 'nuevo' después
+            carried = {course_id: entry for course_id, entry in previous_state.items()
+                       if course_id not in current_state}
+            current_state.update(carried)
+            logging.warning(f"⚠️ Verificación incompleta ({', '.join(self.failed_slices) or 'error'}): "
+                            f"se conservan {len(carried)} cursos del estado anterior")
+        
+        return current_state, found, total_changes
+    
     def run_search(self):
         """Ejecutar búsqueda de cursos con plazas disponibles"""
         logging.info("🚀 === BOT DEFINITIVO - MONITOREO AUTOMÁTICO ===")
@@ -675,43 +1564,23 @@ class StudiaBotDefinitivo:
         logging.info(f"🎯 Objetivo: Detectar nuevas plazas disponibles")
         logging.info(f"📧 Notificación a: {', '.join(self.email_to)} ({len(self.email_to)} destinatarios)")
         
+        def notify(new_courses):
+            logging.info(f"🚨 CAMBIOS DETECTADOS: {len(new_courses)} modificaciones")
+            # Enviar email de alerta
+            if self.send_changes_email(new_courses):
+                logging.info("✅ Email de alerta enviado exitosamente")
+            else:
+                logging.error("❌ Error enviando email de alerta")
+        
         try:
-            # Cargar estado anterior
+            # Cargar estado anterior (indexado por nombre y mes)
             previous_state = self.load_previous_state()
+            current_state, _, _ = self.check_courses(previous_state, notify)
             
-            # Obtener cursos actuales
-            current_courses = self.get_available_courses()
-            
-            if current_courses:
-                logging.info(f"✅ CURSOS ACTUALES ({len(current_courses)}):")
-                for i, course in enumerate(current_courses, 1):
-                    logging.info(f"   {i}. {course['title']}")
-                    logging.info(f"      📅 {course['month'].title()} | 🎯 {course['plazas_disponibles']} plazas libres")
-                
-                # Buscar cambios
-                new_courses = self.find_new_courses(current_courses, previous_state)
-                
-                if new_courses:
-                    logging.info(f"🚨 CAMBIOS DETECTADOS: {len(new_courses)} modificaciones")
-                    # Enviar email de alerta
-                    if self.send_changes_email(new_courses):
-                        logging.info("✅ Email de alerta enviado exitosamente")
-                    else:
-                        logging.error("❌ Error enviando email de alerta")
-                else:
-                    logging.info("ℹ️ Sin cambios desde la última verificación")
-                
-                # Guardar estado actual
-                self.save_courses_state(current_courses)
-                # Commit automático del estado actualizado
-                self.commit_state_changes()
-                
-            else:
-                logging.info("ℹ️ No hay cursos con plazas disponibles")
-                # Guardar estado vacío
-                self.save_courses_state([])
-                # Commit automático del estado actualizado
-                self.commit_state_changes()
+            # Guardar estado actual (vacío si no hay cursos)
+            self.write_courses_state(current_state)
+            # Commit automático del estado actualizado
+            self.commit_state_changes()
             
             logging.info("✅ Verificación completada")
             return True
@@ -720,6 +1589,125 @@ class StudiaBotDefinitivo:
             logging.error(f"❌ Error en la verificación: {e}")
             return False
     
+    def run_replay(self, path):
+        """Ejecutar el pipeline completo contra respuestas grabadas (sin red, sin email, sin git)"""
+        self.offline = True
+        # No volver a archivar lo que se está reproduciendo
+        self.archive = None
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        # El logging detallado por curso domina el tiempo de replay
+        root_logger.setLevel(logging.WARNING)
+        
+        previous_state = {}
+        runs = total_courses = total_changes = 0
+        start = time.perf_counter()
+        
+        try:
+            for label, session in iter_replay_sessions(path):
+                self.session = session
+                new_courses = []
+                
+                def notify(changes):
+                    # Construir la alerta sin enviarla
+                    self.build_changes_email(changes).as_string()
+                    new_courses.extend(changes)
+                
+                # Mismo recorrido página a página que run_search()
+                previous_state, found, _ = self.check_courses(previous_state, notify)
+                self.build_clean_email(list(previous_state.values())).as_string()
+                
+                runs += 1
+                total_courses += found
+                total_changes += len(new_courses)
+                
+                print(f"▶️ {label}: {found} cursos con plazas, {len(new_courses)} cambios")
+                for course in new_courses:
+                    marker = '🆕' if course['status'] == 'nuevo' else '📈'
+                    print(f"   {marker} {course['month']}: {course['title']} ({course['plazas_disponibles']} plazas)")
+        finally:
+            root_logger.setLevel(previous_level)
+        
+        elapsed = time.perf_counter() - start
+        print(f"🏁 Replay: {runs} verificaciones, {total_courses} cursos, {total_changes} cambios en {elapsed:.3f}s")
+        return runs > 0
+    
+    @staticmethod
+    def synthetic_changes(count):
+        """Generar un conjunto de cambios ficticio (mitad nuevos, mitad con más plazas)"""
+        changes = []
+        for i in range(count):
+            month = 'julio' if i % 2 == 0 else 'agosto'
+            course = {
+                'title': f"Curso de prueba {i + 1} - {month.title()} 2026 - Residencia {i % 7 + 1}",
+                'month': month,
+                'capacidad': 30,
+                'ocupacion': 30 - (i % 5 + 1),
+                'plazas_disponibles': i % 5 + 1,
+                'available': True
+            }
+            if i % 4 == 3:
+                changes.append({**course, 'status': 'mas_plazas', 'plazas_anteriores': 0})
+            else:
+                changes.append({**course, 'status': 'nuevo'})
+        return changes
+    
+    def run_email_benchmark(self, change_sizes=(1, 10, 50), recipient_sizes=(1, 10, 100), repeats=3):
+        """Medir send_changes_email() contra un servidor SMTP local con cambios y destinatarios ficticios"""
+        saved = (self.smtp_server, self.smtp_port, self.smtp_starttls,
+                 self.email_from, self.email_password, self.email_to)
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        root_logger.setLevel(logging.WARNING)
+        
+        results = []
+        try:
+            with LocalSMTPSink() as sink:
+                self.smtp_server, self.smtp_port = sink.host, sink.port
+                self.smtp_starttls = False
+                self.email_from = 'bot@localhost'
+                self.email_password = None
+                
+                print(f"📮 Servidor SMTP local en {sink.host}:{sink.port}")
+                print(f"{'cambios':>8} {'destin.':>8} {'msg/s':>10} {'ms/alerta':>10} {'KB/msg':>8} {'pico KB':>9}")
+                
+                for changes_count in change_sizes:
+                    new_courses = self.synthetic_changes(changes_count)
+                    for recipients_count in recipient_sizes:
+                        self.email_to = [f"destinatario{i}@example.com" for i in range(recipients_count)]
+                        sink.reset()
+                        
+                        start = time.perf_counter()
+                        for _ in range(repeats):
+                            if not self.send_changes_email(new_courses):
+                                raise RuntimeError("el envío al servidor SMTP local falló")
+                        elapsed = time.perf_counter() - start
+                        messages, size = sink.messages, sink.bytes
+                        
+                        # Medir memoria en una pasada aparte para no distorsionar los tiempos
+                        tracemalloc.start()
+                        self.send_changes_email(new_courses)
+                        _, peak = tracemalloc.get_traced_memory()
+                        tracemalloc.stop()
+                        
+                        result = {
+                            'cambios': changes_count,
+                            'destinatarios': recipients_count,
+                            'mensajes_por_segundo': messages / elapsed if elapsed else 0.0,
+                            'ms_por_alerta': elapsed / repeats * 1000,
+                            'kb_por_mensaje': size / messages / 1024 if messages else 0.0,
+                            'pico_memoria_kb': peak / 1024
+                        }
+                        results.append(result)
+                        print(f"{changes_count:>8} {recipients_count:>8} {result['mensajes_por_segundo']:>10.1f} "
+                              f"{result['ms_por_alerta']:>10.2f} {result['kb_por_mensaje']:>8.1f} {result['pico_memoria_kb']:>9.1f}")
+        finally:
+            (self.smtp_server, self.smtp_port, self.smtp_starttls,
+             self.email_from, self.email_password, self.email_to) = saved
+            root_logger.setLevel(previous_level)
+        
+        return results
+    
     def run_monitoring(self):
         """Ejecutar monitoreo continuo cada 10 minutos"""
         logging.info("🔄 === INICIANDO MONITOREO AUTOMÁTICO ===")
@@ -765,6 +1753,50 @@ def main():
     
     bot = StudiaBotDefinitivo()
     
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--historial':
+        # Consultar el archivo histórico (no requiere credenciales)
+        if not bot.archive:
+            print("❌ Falta CATALOG_ARCHIVE con la ruta del archivo histórico")
+            return
+        text = sys.argv[2] if len(sys.argv) > 2 else ''
+        for entry in bot.archive.course_history(text):
+            fecha = datetime.fromtimestamp(entry['timestamp']).strftime('%d/%m/%Y %H:%M')
+            libres = entry['capacidad'] - entry['ocupacion']
+            print(f"{fecha} | {entry['ocupacion']}/{entry['capacidad']} ({libres} libres) | {entry['nombre']}")
+        return
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--historial-plazas':
+        # Cursos con plazas en cada verificación archivada (no requiere credenciales)
+        if not bot.archive:
+            print("❌ Falta CATALOG_ARCHIVE con la ruta del archivo histórico")
+            return
+        for run_ts, courses in bot.iter_archive_availability():
+            fecha = datetime.fromtimestamp(run_ts).strftime('%d/%m/%Y %H:%M')
+            plazas = sum(course['plazas_disponibles'] for course in courses)
+            print(f"{fecha} | {len(courses)} cursos con plazas | {plazas} plazas libres")
+        return
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark-email':
+        # Prueba de carga de las notificaciones contra un SMTP local (no requiere credenciales)
+        try:
+            change_sizes = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 10, 50]
+            recipient_sizes = [int(n) for n in sys.argv[3].split(',')] if len(sys.argv) > 3 else [1, 10, 100]
+        except ValueError:
+            print("❌ Uso: --benchmark-email [cambios,...] [destinatarios,...]")
+            return
+        bot.run_email_benchmark(change_sizes, recipient_sizes)
+        return
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--replay':
+        # Reproducir respuestas grabadas (no requiere credenciales)
+        if len(sys.argv) < 3 or not os.path.exists(sys.argv[2]):
+            print("❌ Uso: --replay <directorio o archivo histórico>")
+            return
+        success = bot.run_replay(sys.argv[2])
+        print("✅ Completado" if success else "❌ Sin verificaciones grabadas")
+        return
+    
     # Verificar configuración
     required_fields = [
         (bot.username, "STUDIA_USERNAME"),
@@ -788,7 +1820,6 @@ def main():
     print()
     
     # Ejecutar
-    import sys
     if len(sys.argv) > 1 and sys.argv[1] == '--once':
         print("🔍 Ejecutando verificación única...")
         success = bot.run_search()
@@ -801,6 +1832,10 @@ def main():
         print("💡 Opciones disponibles:")
         print("   --once     : Verificación única")
         print("   --monitor  : Monitoreo cada 10 minutos")
+        print("   --historial [texto] : Consultar el archivo histórico")
+        print("   --historial-plazas  : Cursos con plazas en cada verificación archivada")
+        print("   --replay <dir>      : Reproducir respuestas grabadas")
+        print("   --benchmark-email   : Prueba de carga de emails con SMTP local")
         print()
         print("🔄 Iniciando monitoreo por defecto...")
         bot.run_monitoring()